@@ -1,9 +1,11 @@
+from typing import ClassVar
 from pydantic import BaseModel
 import json
+import time
 from dotenv import load_dotenv
 from datetime import datetime
 from market import get_share_price
-from database import write_account, read_account, write_log
+from database import write_account, read_account, read_accounts, read_account_version, write_log
 
 load_dotenv(override=True)
 
@@ -32,9 +34,38 @@ class Account(BaseModel):
     holdings: dict[str, int]
     transactions: list[Transaction]
     portfolio_value_time_series: list[tuple[str, float]]
+    version: int = 0
+
+    # One live Account per name, shared by everything in this process
+    _registry: ClassVar[dict[str, "Account"]] = {}
 
     @classmethod
     def get(cls, name: str):
+        account = cls._registry.get(name.lower())
+        if account is None:
+            account = cls._registry[name.lower()] = cls._load(name)
+        else:
+            account._refresh_if_stale()
+        return account
+
+    @classmethod
+    def get_many(cls, names: list[str]) -> dict[str, "Account"]:
+        """ Load several accounts with a single query, keyed by the names given. """
+        rows = read_accounts(names)
+        accounts = {}
+        for name in names:
+            fields = rows.get(name.lower())
+            account = cls._registry.get(name.lower())
+            if account is None:
+                account = cls(**fields) if fields else cls._load(name)
+                cls._registry[name.lower()] = account
+            elif fields and fields.get("version") != account.version:
+                account._apply(fields)
+            accounts[name] = account
+        return accounts
+
+    @classmethod
+    def _load(cls, name: str):
         fields = read_account(name.lower())
         if not fields:
             fields = {
@@ -43,13 +74,31 @@ class Account(BaseModel):
                 "strategy": "",
                 "holdings": {},
                 "transactions": [],
-                "portfolio_value_time_series": []
+                "portfolio_value_time_series": [],
+                "version": 0
             }
             write_account(name, fields)
         return cls(**fields)
+
+    def _refresh_if_stale(self):
+        """ Reload fields from the database if another process has saved this account since. """
+        version = read_account_version(self.name)
+        if version is not None and version == self.version:
+            return
+        fields = read_account(self.name)
+        if fields:
+            self._apply(fields)
+
+    def _apply(self, fields: dict):
+        """ Overwrite this instance in place so every holder of it sees the new values. """
+        fresh = type(self)(**fields)
+        # One dict update swaps every field at once for threads reading this shared instance
+        self.__dict__.update(fresh.__dict__)
     
     
     def save(self):
+        # Unique per write, so a save from another process always differs from our cached version
+        self.version = time.time_ns()
         write_account(self.name.lower(), self.model_dump())
 
     def reset(self, strategy: str):
@@ -146,9 +195,10 @@ class Account(BaseModel):
         """ Report the user's profit or loss at any point in time. """
         return self.calculate_profit_loss()
 
-    def list_transactions(self):
-        """ List all transactions made by the user. """
-        return [transaction.model_dump() for transaction in self.transactions]
+    def list_transactions(self, limit: int | None = None):
+        """ List all transactions made by the user, or only the most recent `limit` of them. """
+        transactions = self.transactions[-limit:] if limit else self.transactions
+        return [transaction.model_dump() for transaction in transactions]
     
     def report(self) -> str:
         """ Return a json string representing the account.  """
@@ -156,7 +206,7 @@ class Account(BaseModel):
         self.portfolio_value_time_series.append((datetime.now().strftime("%Y-%m-%d %H:%M:%S"), portfolio_value))
         self.save()
         pnl = self.calculate_profit_loss(portfolio_value)
-        data = self.model_dump()
+        data = self.model_dump(exclude={"version"})
         data["total_portfolio_value"] = portfolio_value
         data["total_profit_loss"] = pnl
         write_log(self.name, "account", f"Retrieved account details")
@@ -2,14 +2,23 @@ import asyncio
 from typing import Optional
 
 import gradio as gr
-import pandas as pd
-import plotly.express as px
+import plotly.graph_objects as go
 
 from util import css, js, Color
 from accounts import Account
-from database import read_log
-
-from trading_floor import names, lastnames, short_model_names, create_traders
+from database import (
+    read_log_signatures,
+    read_logs_multi,
+    read_account_version,
+)
+
+from trading_floor import (
+    names,
+    lastnames,
+    short_model_names,
+    create_traders,
+    MAX_CONCURRENT_TRADERS,
+)
 
 from tracers import LogTracer
 from agents import add_trace_processor
@@ -27,93 +36,149 @@ mapper = {
     "response": Color.MAGENTA,
     "account": Color.RED,
 }
+mapper_str = {k: v.value for k, v in mapper.items()}
+_WHITE = Color.WHITE.value
+
+# Only the most recent transactions are sent to the card's table
+MAX_TRANSACTION_ROWS = 20
+
+# Only the most recent portfolio values are drawn; the full history stays in the account
+MAX_CHART_POINTS = 500
+
+# Log polling backs off from LOG_POLL_MIN towards LOG_POLL_MAX seconds while no trader logs anything
+LOG_POLL_MIN = 0.5
+LOG_POLL_MAX = 5.0
+LOG_POLL_BACKOFF = 1.5
+
+# Portfolio chart layout, shared by every card's figure
+_LAYOUT = dict(
+    height=250,
+    margin=dict(l=40, r=20, t=20, b=40),
+    paper_bgcolor="#bbb",
+    plot_bgcolor="#dde",
+    xaxis=dict(type="date", tickformat="%m/%d", tickangle=45, tickfont=dict(size=8)),
+    yaxis=dict(tickfont=dict(size=8), tickformat=",.0f"),
+)
+
+# Rendered log HTML per trader name, keyed by the newest log entry's signature
+_logs_cache: dict[str, tuple[tuple | None, str]] = {}
+
+
+def render_logs(logs) -> str:
+    parts = []
+    append = parts.append
+    color_get = mapper_str.get
+    for timestamp, type, message in logs:
+        color = color_get(type, _WHITE)
+        append(f"<span style='color:{color}'>{timestamp} : [{type}] {message}</span><br/>")
+    return f"<div style='height:200px; overflow-y:auto;'>{''.join(parts)}</div>"
+
+
+def _update_logs_cache(names: list[str]) -> None:
+    """Re-render the cached logs of any names with new entries."""
+    signatures = read_log_signatures(names)
+    stale = [
+        name
+        for name, key in signatures.items()
+        if name not in _logs_cache or _logs_cache[name][0] != key
+    ]
+    if stale:
+        for name, logs in read_logs_multi(stale, last_n=13).items():
+            _logs_cache[name] = (signatures[name], render_logs(logs))
+
+
+def current_logs(traders: list["Trader"]) -> list:
+    """Return every trader's current log HTML, for a newly opened page.
+
+    Returns one value per log panel followed by the signatures sent to this session.
+    """
+    _update_logs_cache([t.name for t in traders])
+    entries = [_logs_cache[t.name] for t in traders]
+    return [html for _, html in entries] + [tuple(key for key, _ in entries)]
+
+
+def refresh_logs(traders: list["Trader"], sent: tuple | None, interval: float) -> list:
+    """Refresh every trader's log panel with one signature query and one batched read.
+
+    `sent` holds the signatures this session last received, one per panel, and `interval`
+    is this session's current poll interval. Returns one value per log panel, then the
+    updated signatures, the new interval, and the log timer update.
+    """
+    _update_logs_cache([t.name for t in traders])
+    # Force update only for panels whose content changed since this session last received it
+    entries = [_logs_cache[t.name] for t in traders]
+    updates = [
+        html if sent is None or key != sent[i] else gr.update()
+        for i, (key, html) in enumerate(entries)
+    ]
+    # Poll fast again as soon as anything changed, otherwise back off
+    if any(isinstance(update, str) for update in updates):
+        new_interval = LOG_POLL_MIN
+    else:
+        new_interval = min(interval * LOG_POLL_BACKOFF, LOG_POLL_MAX)
+    timer = gr.Timer(value=new_interval) if new_interval != interval else gr.update()
+    return updates + [tuple(key for key, _ in entries), new_interval, timer]
 
 
 class Trader:
     """UI-facing trader card that reads from Account/logs."""
 
-    def __init__(self, name: str, lastname: str, model_name: str):
+    _TMPL = (
+        "<div style='text-align: center;background-color:{color}; padding:4px;'>"
+        "<span style='font-size:24px'>${pv:,.0f}</span>"
+        "<span style='font-size:18px'>&nbsp;&nbsp;&nbsp;{emoji}&nbsp;${pnl:,.0f}</span>"
+        "</div>"
+    )
+
+    def __init__(self, name: str, lastname: str, model_name: str, account: Account | None = None):
         self.name = name
         self.lastname = lastname
         self.model_name = model_name
-        self.account = Account.get(name)
+        self.title_html = (
+            "<div style='text-align: center;font-size:24px;'>"
+            f"{name}<span style='color:#ccc;font-size:16px;'> ({model_name}) - {lastname}</span>"
+            "</div>"
+        )
+        self.account = account if account is not None else Account.get(name)
 
     def reload(self):
         self.account = Account.get(self.name)
 
+    def get_version(self):
+        return read_account_version(self.name)
+
     def get_title(self) -> str:
-        return (
-            "<div style='text-align: center;font-size:24px;'>"
-            f"{self.name}<span style='color:#ccc;font-size:16px;'> ({self.model_name}) - {self.lastname}</span>"
-            "</div>"
-        )
+        return self.title_html
 
     def get_strategy(self) -> str:
         return self.account.get_strategy()
 
-    def get_portfolio_value_df(self) -> pd.DataFrame:
-        df = pd.DataFrame(
-            self.account.portfolio_value_time_series, columns=["datetime", "value"]
-        )
-        df["datetime"] = pd.to_datetime(df["datetime"])
-        return df
-
     def get_portfolio_value_chart(self):
-        df = self.get_portfolio_value_df()
-        fig = px.line(df, x="datetime", y="value")
-        margin = dict(l=40, r=20, t=20, b=40)
-        fig.update_layout(
-            height=250,
-            margin=margin,
-            xaxis_title=None,
-            yaxis_title=None,
-            paper_bgcolor="#bbb",
-            plot_bgcolor="#dde",
-        )
-        fig.update_xaxes(tickformat="%m/%d", tickangle=45, tickfont=dict(size=8))
-        fig.update_yaxes(tickfont=dict(size=8), tickformat=",.0f")
-        return fig
-
-    def get_holdings_df(self) -> pd.DataFrame:
-        holdings = self.account.get_holdings()
-        if not holdings:
-            return pd.DataFrame(columns=["Symbol", "Quantity"])
-        return pd.DataFrame(
-            [{"Symbol": symbol, "Quantity": quantity} for symbol, quantity in holdings.items()]
-        )
-
-    def get_transactions_df(self) -> pd.DataFrame:
-        transactions = self.account.list_transactions()
-        if not transactions:
-            return pd.DataFrame(
-                columns=["Timestamp", "Symbol", "Quantity", "Price", "Rationale"]
-            )
-        return pd.DataFrame(transactions)
+        # Plotly parses the stored "%Y-%m-%d %H:%M:%S" strings itself, so no pandas needed
+        series = self.account.portfolio_value_time_series[-MAX_CHART_POINTS:]
+        xs, ys = zip(*series) if series else ((), ())
+        # A new figure per call, since refreshes for different sessions run in parallel threads
+        return go.Figure(go.Scattergl(x=xs, y=ys, mode="lines"), layout=_LAYOUT)
+
+    def get_holdings_rows(self) -> list[list]:
+        # Plain rows are Gradio's native Dataframe format, so no pandas round-trip
+        return [[symbol, quantity] for symbol, quantity in self.account.get_holdings().items()]
+
+    def get_transactions_rows(self) -> list[list]:
+        transactions = self.account.list_transactions(limit=MAX_TRANSACTION_ROWS)
+        return [
+            [t["timestamp"], t["symbol"], t["quantity"], t["price"], t["rationale"]]
+            for t in transactions
+        ]
 
     def get_portfolio_value(self) -> str:
         portfolio_value = self.account.calculate_portfolio_value() or 0.0
         pnl = self.account.calculate_profit_loss(portfolio_value) or 0.0
-        color = "green" if pnl >= 0 else "red"
-        emoji = "⬆" if pnl >= 0 else "⬇"
-        return (
-            f"<div style='text-align: center;background-color:{color}; padding:4px;'>"
-            f"<span style='font-size:24px'>${portfolio_value:,.0f}</span>"
-            f"<span style='font-size:18px'>&nbsp;&nbsp;&nbsp;{emoji}&nbsp;${pnl:,.0f}</span>"
-            "</div>"
-        )
-
-    def get_logs(self, previous=None) -> str:
-        logs = read_log(self.name, last_n=13)
-        response = ""
-        for log in logs:
-            timestamp, type, message = log
-            color = mapper.get(type, Color.WHITE).value
-            response += f"<span style='color:{color}'>{timestamp} : [{type}] {message}</span><br/>"
-        response = f"<div style='height:200px; overflow-y:auto;'>{response}</div>"
-        # Force update if content changed
-        if response != previous:
-            return response
-        return gr.update()
+        if pnl >= 0:
+            color, emoji = "green", "⬆"
+        else:
+            color, emoji = "red", "⬇"
+        return self._TMPL.format(color=color, pv=portfolio_value, pnl=pnl, emoji=emoji)
 
 
 class TraderView:
@@ -124,6 +189,7 @@ class TraderView:
         self.holdings_table = None
         self.transactions_table = None
         self.log = None
+        self.rendered_version = None
 
     def make_ui(self):
         """Render the trader card UI inside a group column for horizontal layout."""
@@ -131,13 +197,15 @@ class TraderView:
             with gr.Column():
                 gr.HTML(self.trader.get_title())
 
-                # ✅ Initialize components with initial values, not function refs
-                self.portfolio_value = gr.HTML(value=self.trader.get_portfolio_value())
-                self.chart = gr.Plot(value=self.trader.get_portfolio_value_chart())
-                self.log = gr.HTML(value=self.trader.get_logs())
+                # Empty placeholders; values are filled in by the page load event
+                self.portfolio_value = gr.HTML()
+                self.chart = gr.Plot(value=None)
+                self.log = gr.HTML()
+                # Account version this session's card was last rendered from
+                self.rendered_version = gr.State(None)
 
                 self.holdings_table = gr.Dataframe(
-                    value=self.trader.get_holdings_df(),
+                    value=None,
                     label="Holdings",
                     headers=["Symbol", "Quantity"],
                     row_count=(5, "dynamic"),
@@ -146,7 +214,7 @@ class TraderView:
                     elem_classes=["dataframe-fix-small"],
                 )
                 self.transactions_table = gr.Dataframe(
-                    value=self.trader.get_transactions_df(),
+                    value=None,
                     label="Recent Transactions",
                     headers=["Timestamp", "Symbol", "Quantity", "Price", "Rationale"],
                     row_count=(5, "dynamic"),
@@ -159,39 +227,55 @@ class TraderView:
         timer = gr.Timer(value=120)
         timer.tick(
             fn=self.refresh,
-            inputs=[],
+            inputs=[self.rendered_version],
             outputs=[
                 self.portfolio_value,
                 self.chart,
                 self.holdings_table,
                 self.transactions_table,
+                self.rendered_version,
             ],
             show_progress="hidden",
             queue=False,
         )
 
-        # Fast log refresher
-        log_timer = gr.Timer(value=0.5)
-        log_timer.tick(
-            fn=self.trader.get_logs,
-            inputs=[self.log],
-            outputs=[self.log],
-            show_progress="hidden",
-            queue=False,
-        )
-
-    def refresh(self):
-        # Always reload data from backend for fresh values
+    async def refresh(self, rendered_version):
+        # Keep SQLite and market reads off the event loop shared with the trading loop
+        return await asyncio.to_thread(self._refresh, rendered_version)
+
+    async def load(self):
+        # A newly opened page has only placeholders, so always send full values
+        return await asyncio.to_thread(self._refresh, None)
+
+    def _refresh(self, rendered_version):
+        # Only reload data from backend when the account has been written since this session's render
+        version = self.trader.get_version()
+        if version is not None and version == rendered_version:
+            # The value header uses live share prices, so it is recomputed on every tick
+            return (
+                self.trader.get_portfolio_value(),
+                gr.update(),
+                gr.update(),
+                gr.update(),
+                rendered_version,
+            )
         self.trader.reload()
         return (
             self.trader.get_portfolio_value(),
             self.trader.get_portfolio_value_chart(),
-            self.trader.get_holdings_df(),
-            self.trader.get_transactions_df(),
+            self.trader.get_holdings_rows(),
+            self.trader.get_transactions_rows(),
+            version,
         )
 
 
 # -------------------------------------------------------------------
+# Agent traders and the log tracer are created once and outlive any single
+# controller run, so stopping and restarting trading reuses them.
+_tracer_installed = False
+_traders_cache = None
+
+
 class TradingController:
     """Runs the agent trading loop in the background."""
 
@@ -204,15 +288,26 @@ class TradingController:
         if self.task and not self.task.done():
             return "⚠️ Trading is already running."
 
+        global _tracer_installed, _traders_cache
         self.stop_event = asyncio.Event()
-        add_trace_processor(LogTracer())
-        traders = create_traders()
+        if not _tracer_installed:
+            add_trace_processor(LogTracer())
+            _tracer_installed = True
+        if _traders_cache is None:
+            _traders_cache = create_traders()
+        traders = _traders_cache
+        semaphore = asyncio.Semaphore(MAX_CONCURRENT_TRADERS)
+
+        async def _run(trader):
+            async with semaphore:
+                return await trader.run()
 
         async def _loop():
             try:
                 while not self.stop_event.is_set():
                     if run_when_closed or is_market_open():
-                        await asyncio.gather(*[t.run() for t in traders])
+                        # Bounded fan-out; gather cancels every trader run when the loop is cancelled
+                        await asyncio.gather(*[_run(t) for t in traders])
                     try:
                         await asyncio.wait_for(
                             self.stop_event.wait(), timeout=interval_minutes * 60
@@ -242,12 +337,25 @@ class TradingController:
         self.running = False
         return "🛑 Trading stopped."
 
+    def reset_traders(self):
+        """Drop the cached agent traders so the next start rebuilds them (e.g. after a config change).
+
+        Only allowed while trading is stopped, since running traders still use the cached instances.
+        """
+        global _traders_cache
+        if self.task and not self.task.done():
+            return "⚠️ Stop trading before resetting traders."
+        _traders_cache = None
+        return "♻️ Traders will be rebuilt on the next start."
+
 
 # -------------------------------------------------------------------
 def create_ui():
     """Create the main Gradio UI for the trading simulation"""
+    # One query for every trader's account rather than one per card
+    accounts = Account.get_many(names)
     traders = [
-        Trader(trader_name, lastname, model_name)
+        Trader(trader_name, lastname, model_name, accounts[trader_name])
         for trader_name, lastname, model_name in zip(names, lastnames, short_model_names)
     ]
     trader_views = [TraderView(trader) for trader in traders]
@@ -306,6 +414,42 @@ def create_ui():
                         with gr.Column(scale=1):
                             tv.make_ui()
 
+        # Fast log refresher shared by all cards
+        logs = [tv.log for tv in trader_views]
+        # Signatures of the logs this session has received, so other sessions can't mark them sent
+        log_keys = gr.State(None)
+        log_interval = gr.State(LOG_POLL_MIN)
+
+        async def _refresh_logs(sent, interval):
+            return await asyncio.to_thread(refresh_logs, traders, sent, interval)
+
+        log_timer = gr.Timer(value=LOG_POLL_MIN)
+        log_timer.tick(
+            fn=_refresh_logs,
+            inputs=[log_keys, log_interval],
+            outputs=logs + [log_keys, log_interval, log_timer],
+            show_progress="hidden",
+            queue=False,
+        )
+        # Populate the cards after the page has rendered rather than while building it
+        for tv in trader_views:
+            ui.load(
+                fn=tv.load,
+                outputs=[
+                    tv.portfolio_value,
+                    tv.chart,
+                    tv.holdings_table,
+                    tv.transactions_table,
+                    tv.rendered_version,
+                ],
+                show_progress="hidden",
+            )
+
+        async def _current_logs():
+            return await asyncio.to_thread(current_logs, traders)
+
+        ui.load(fn=_current_logs, outputs=logs + [log_keys], show_progress="hidden", queue=False)
+
     return ui
 
 
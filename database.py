@@ -1,5 +1,6 @@
 import sqlite3
 import json
+import threading
 from datetime import datetime
 from dotenv import load_dotenv
 
@@ -9,6 +10,8 @@ DB = "accounts.db"
 
 
 with sqlite3.connect(DB) as conn:
+    # WAL lets readers (the UI) proceed while a trader is writing
+    conn.execute('PRAGMA journal_mode=WAL')
     cursor = conn.cursor()
     cursor.execute('CREATE TABLE IF NOT EXISTS accounts (name TEXT PRIMARY KEY, account TEXT)')
     cursor.execute('''
@@ -20,12 +23,22 @@ with sqlite3.connect(DB) as conn:
             message TEXT
         )
     ''')
+    cursor.execute('CREATE INDEX IF NOT EXISTS logs_name_id ON logs (name, id)')
     cursor.execute('CREATE TABLE IF NOT EXISTS market (date TEXT PRIMARY KEY, data TEXT)')
     conn.commit()
 
+_local = threading.local()
+
+def _connect():
+    """Return this thread's connection, opening it on first use."""
+    conn = getattr(_local, "conn", None)
+    if conn is None:
+        conn = _local.conn = sqlite3.connect(DB)
+    return conn
+
 def write_account(name, account_dict):
     json_data = json.dumps(account_dict)
-    with sqlite3.connect(DB) as conn:
+    with _connect() as conn:
         cursor = conn.cursor()
         cursor.execute('''
             INSERT INTO accounts (name, account)
@@ -35,11 +48,28 @@ def write_account(name, account_dict):
         conn.commit()
 
 def read_account(name):
-    with sqlite3.connect(DB) as conn:
+    with _connect() as conn:
         cursor = conn.cursor()
         cursor.execute('SELECT account FROM accounts WHERE name = ?', (name.lower(),))
         row = cursor.fetchone()
         return json.loads(row[0]) if row else None
+
+def read_accounts(names):
+    keys = [name.lower() for name in names]
+    if not keys:
+        return {}
+    placeholders = ", ".join("?" * len(keys))
+    with _connect() as conn:
+        cursor = conn.cursor()
+        cursor.execute(f'SELECT name, account FROM accounts WHERE name IN ({placeholders})', keys)
+        return {name: json.loads(account) for name, account in cursor.fetchall()}
+
+def read_account_version(name):
+    with _connect() as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT COALESCE(json_extract(account, '$.version'), 0) FROM accounts WHERE name = ?", (name.lower(),))
+        row = cursor.fetchone()
+        return row[0] if row else None
     
 def write_log(name: str, type: str, message: str):
     """
@@ -52,7 +82,7 @@ def write_log(name: str, type: str, message: str):
     """
     now = datetime.now().isoformat()
     
-    with sqlite3.connect(DB) as conn:
+    with _connect() as conn:
         cursor = conn.cursor()
         cursor.execute('''
             INSERT INTO logs (name, datetime, type, message)
@@ -71,20 +101,72 @@ def read_log(name: str, last_n=10):
     Returns:
         list: A list of tuples containing (datetime, type, message)
     """
-    with sqlite3.connect(DB) as conn:
+    with _connect() as conn:
         cursor = conn.cursor()
         cursor.execute('''
             SELECT datetime, type, message FROM logs 
             WHERE name = ? 
-            ORDER BY datetime DESC
+            ORDER BY id DESC
             LIMIT ?
         ''', (name.lower(), last_n))
         
-        return reversed(cursor.fetchall())
+        rows = cursor.fetchall()
+        rows.reverse()
+        return rows
+
+def read_log_signatures(names: list[str]):
+    """
+    Read the signature of the newest log entry for each of several names in one query.
+    
+    Args:
+        names (list[str]): The names to retrieve signatures for
+        
+    Returns:
+        dict: Maps each name to the (id, datetime) of its newest entry, or None if it has no logs
+    """
+    keys = {name.lower(): name for name in names}
+    signatures = dict.fromkeys(names)
+    if not keys:
+        return signatures
+    query = " UNION ALL ".join(
+        ["SELECT * FROM (SELECT name, id, datetime FROM logs WHERE name = ? ORDER BY id DESC LIMIT 1)"] * len(keys)
+    )
+    with _connect() as conn:
+        cursor = conn.cursor()
+        cursor.execute(query, list(keys))
+        for name, id, dt in cursor.fetchall():
+            signatures[keys[name]] = (id, dt)
+    return signatures
+
+def read_logs_multi(names: list[str], last_n=10):
+    """
+    Read the most recent log entries for each of several names in one query.
+    
+    Args:
+        names (list[str]): The names to retrieve logs for
+        last_n (int): Number of most recent entries to retrieve per name
+        
+    Returns:
+        dict: Maps each name to a list of tuples containing (datetime, type, message)
+    """
+    keys = {name.lower(): name for name in names}
+    logs = {name: [] for name in names}
+    if not keys:
+        return logs
+    query = " UNION ALL ".join(
+        ["SELECT * FROM (SELECT name, id, datetime, type, message FROM logs WHERE name = ? ORDER BY id DESC LIMIT ?)"] * len(keys)
+    )
+    params = [param for key in keys for param in (key, last_n)]
+    with _connect() as conn:
+        cursor = conn.cursor()
+        cursor.execute(query + " ORDER BY id", params)
+        for name, _, dt, type, message in cursor.fetchall():
+            logs[keys[name]].append((dt, type, message))
+    return logs
 
 def write_market(date: str, data: dict) -> None:
     data_json = json.dumps(data)
-    with sqlite3.connect(DB) as conn:
+    with _connect() as conn:
         cursor = conn.cursor()
         cursor.execute('''
             INSERT INTO market (date, data)
@@ -94,7 +176,7 @@ def write_market(date: str, data: dict) -> None:
         conn.commit()
 
 def read_market(date: str) -> dict | None:
-    with sqlite3.connect(DB) as conn:
+    with _connect() as conn:
         cursor = conn.cursor()
         cursor.execute('SELECT data FROM market WHERE date = ?', (date,))
         row = cursor.fetchone()